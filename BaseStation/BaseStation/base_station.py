@@ -1,5 +1,16 @@
+import array
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
 import rclpy
+from rclpy.executors import MultiThreadedExecutor, SingleThreadedExecutor
+from rclpy.impl.implementation_singleton import rclpy_implementation as _rclpy
 from rclpy.node import Node
+from rclpy.qos import DurabilityPolicy, HistoryPolicy, QoSProfile, ReliabilityPolicy
+from rclpy.serialization import serialize_message
 from std_msgs.msg import Float32MultiArray, MultiArrayDimension
 
 import tkinter as tk
@@ -8,6 +19,19 @@ from communication import RefBoxHandler # WiFiHandler is managed by Robot class
 
 # from base_station_UI import load_config # If logic needed config directly
 
+# RefBox status markers -> connected flag; one regex scan per message instead of one `in` per marker
+REFBOX_STATUS = {
+    "Connection Established": True,
+    "Connected to RefBox": True,
+    "connection refused": False,
+    "connection error": False,
+}
+REFBOX_STATUS_RE = re.compile("|".join(re.escape(marker) for marker in REFBOX_STATUS))
+
+# Publisher.publish() takes pre-serialized bytes only on rclpy versions whose C extension
+# exposes Publisher.publish_raw; older ones accept message instances only
+RAW_PUBLISH_SUPPORTED = hasattr(getattr(_rclpy, 'Publisher', None), 'publish_raw')
+
 class BaseStationLogic:
     def __init__(self, ui):
         self.ui = ui
@@ -29,13 +53,29 @@ class BaseStationLogic:
         )
         # self.refbox_messages = [] # store all messages from RefBox here (UI logs them)0
 
+        # World-state worker: aggregation runs off the Tk thread; painting stays on a Tk after() tick
+        self.world_lock = threading.Lock() # Guards global_world between worker and Tk thread
+        self.world_running = False
+        self.world_thread = None
+        self.ui_dirty = True # Set when the field or robot widgets need repainting on the next tick
+        self.last_world_snapshot = None # What the UI last reflected, see world_snapshot()
+
     def connect_to_robots(self):
         self.overall_robot_connection_active = True # Flag that we've attempted to connect
         connection_results = {}
         self.ui.log_message("Attempting to connect to robots...\n")
         for robot in self.robots:
-            if robot.wifi_handler: # Ensure handler exists
-                if robot.connect():
+            if not robot.wifi_handler: # Ensure handler exists
+                 self.ui.log_message(f"No WiFi handler for {robot.name}. Cannot connect.\n")
+                 connection_results[robot.name] = "No Handler"
+
+        # Connect all robots concurrently so startup takes one handshake, not one per robot.
+        # Results are collected here, on the calling (Tk) thread, so logging stays safe.
+        with ThreadPoolExecutor(max_workers=max(1, len(self.robots))) as pool:
+            futures = {pool.submit(robot.connect): robot for robot in self.robots if robot.wifi_handler}
+            for future in as_completed(futures):
+                robot = futures[future]
+                if future.result():
                     # UI update is now handled in the periodic update_robot_ui_elements
                     # and also via robot.status_label if set directly
                     self.ui.log_message(f"Successfully connected to {robot.name}.\n")
@@ -43,22 +83,20 @@ class BaseStationLogic:
                 else:
                     self.ui.log_message(f"Failed to connect to {robot.name}.\n")
                     connection_results[robot.name] = "Failed"
-            else:
-                 self.ui.log_message(f"No WiFi handler for {robot.name}. Cannot connect.\n")
-                 connection_results[robot.name] = "No Handler"
-        
-        # Update UI elements after attempting all connections
-        self.ui.update_robot_ui_elements()
+
+        # Update UI elements after attempting all connections (on the next paint tick)
+        self.ui_dirty = True
         return connection_results
 
 
     def disconnect_from_robots(self):
         self.overall_robot_connection_active = False
         self.ui.log_message("Disconnecting from all robots...\n")
-        for robot in self.robots:
-            robot.disconnect()
+        # Each disconnect may wait up to a second for its receive thread, so run them together
+        with ThreadPoolExecutor(max_workers=max(1, len(self.robots))) as pool:
+            list(pool.map(lambda robot: robot.disconnect(), self.robots))
             # UI update handled by periodic refresh
-        self.ui.update_robot_ui_elements() # Immediate UI feedback
+        self.ui_dirty = True # UI feedback on the next paint tick
         self.ui.log_message("Disconnected from robots.\n")
 
 
@@ -73,10 +111,9 @@ class BaseStationLogic:
 
     def handle_refbox_message(self, message):
         # This is called when a message is received OR on connection status changes from RefBoxHandler
-        if "Connection Established" in message or "Connected to RefBox" in message :
-             self.ui.update_refbox_status(connected=True)
-        elif "connection refused" in message or "connection error" in message:
-             self.ui.update_refbox_status(connected=False)
+        match = REFBOX_STATUS_RE.search(message)
+        if match:
+             self.ui.update_refbox_status(connected=REFBOX_STATUS[match.group(0)])
         
         self.ui.log_refbox_message(message) # Log all messages
 
@@ -90,19 +127,59 @@ class BaseStationLogic:
         self.refbox_handler.stop()
         # self.ui.update_refbox_status(connected=False) # Done by handle_refbox_disconnect
 
+    def start_world_updates(self):
+        if not self.world_thread or not self.world_thread.is_alive():
+            self.world_running = True
+            self.world_thread = threading.Thread(target=self._world_loop, daemon=True)
+            self.world_thread.start()
+
+    def stop_world_updates(self):
+        self.world_running = False
+        if self.world_thread and self.world_thread.is_alive():
+            self.world_thread.join(timeout=1.0)
+
+    def _world_loop(self):
+        while self.world_running:
+            # 1. Update global world map from robots' current states
+            #    (Robot states are updated by their individual handle_received_data via WiFiHandler)
+            with self.world_lock:
+                self.global_world.update_from_robots(self.robots)
+                snapshot = self.world_snapshot()
+            # Repaint only when something visible changed since the last tick
+            if snapshot != self.last_world_snapshot:
+                self.last_world_snapshot = snapshot
+                self.ui_dirty = True
+
+            # Painting is picked up by update_world_state_and_ui on the Tk thread;
+            # Tk widgets must not be touched from here
+            time.sleep(0.2) # Update rate (e.g., 200ms for 5 FPS)
+
+    def world_snapshot(self):
+        # Cheap fingerprint of everything the field and robot widgets display
+        return (
+            tuple(robot.pos_version for robot in self.robots), # Bumped on every pose update
+            tuple(robot.connected for robot in self.robots),
+            tuple(dict(robot.parameters) for robot in self.robots), # Battery and detail-view values
+            tuple(self.global_world.ball_position),
+            frozenset(tuple(obs) for obs in self.global_world.obstacles),
+        )
+
     def update_world_state_and_ui(self):
-        # 1. Update global world map from robots' current states
-        #    (Robot states are updated by their individual handle_received_data via WiFiHandler)
-        self.global_world.update_from_robots(self.robots)
-        
-        # 2. Redraw main field display
-        self.ui.redraw_field()
+        # Runs on the Tk thread; the world state itself is refreshed by _world_loop
+        if self.ui_dirty:
+            self.ui_dirty = False # Clear first so changes made while painting are not lost
+            with self.world_lock:
+                # 1. Redraw main field display
+                self.ui.redraw_field()
 
-        # 3. Update individual robot UI elements (status, battery) in the grid
-        self.ui.update_robot_ui_elements()
-        
-        # 4. If a robot detail window is open, refresh its local map and parameter display
-        #    This is now also handled by update_robot_ui_elements which calls refresh_robot_detail_view
+                # 2. Update individual robot UI elements (status, battery) in the grid
+                self.ui.update_robot_ui_elements()
+
+            # 3. If a robot detail window is open, refresh its local map and parameter display
+            #    This is now also handled by update_robot_ui_elements which calls refresh_robot_detail_view
+
+            # 4. Flush all pending geometry/paint work in one pass
+            self.ui.root.update_idletasks()
 
         # Keep scheduling next update
         self.ui.root.after(200, self.update_world_state_and_ui) # Update rate (e.g., 200ms for 5 FPS)
@@ -117,61 +194,107 @@ class ROSBaseStation(Node):
         self.opponents = []
         self.publ = {}
         self.tim = {}
+        self.labels = {} # "<name>_data", used as both topic name and layout label
+        self.msgs = {} # One pre-built message per publisher, reused on every tick
+        self.bufs = {} # Writable view of the float32 buffer backing each message's data field
+        self.targets = [] # (robot, state row view, payload view, msg or CDR bytes, is_raw, bound publish)
+        self.published_versions = [] # robot.pos_version last sent by each target, parallel to targets
+        self.ticks = 0
+        self.robots.extend(robots)
+        self.opponents.extend(opponents)
+        # All poses live in one contiguous float32 block, robots first then opponents.
+        # Each row is laid out exactly like the published payload: [x, y, 0.0]
+        self.state = np.zeros((len(self.robots) + len(self.opponents), 3), dtype=np.float32)
+        for row, robot in enumerate(self.robots + self.opponents):
+            self.state[row, :2] = robot.position[:2]
+            robot.position = self.state[row] # WiFi updates now write straight into self.state
+        # (Must run before robots connect, or a pose received mid-rebind lands in the old list)
+        # Poses are "latest wins": never queue or resend stale samples
+        pose_qos = QoSProfile(
+            reliability=ReliabilityPolicy.BEST_EFFORT,
+            history=HistoryPolicy.KEEP_LAST,
+            depth=1,
+            durability=DurabilityPolicy.VOLATILE
+        )
         # Create 5 publishers
-        for robot in robots:
-            robot.position = [float(x) for x in robot.position]  # Convert to float
-            self.robots.append(robot)
-        for opponent in opponents:
-            opponent.position = [float(x) for x in opponent.position]  # Convert to float
-            self.robots.append(opponent)
         for i in range(0, 5):  
+            self.labels[f'o{i+1}'] = f'o{i+1}_data'
             self.publ[f'o{i+1}'] = self.create_publisher(
                 Float32MultiArray,
-                f'o{i+1}_data',
-                10
-            )
-            self.tim[f'o{i+1}'] = self.create_timer(
-                0.01,
-                lambda robot_index=i-1, pub_name=f'o{i+1}': self.publish_robot(robot_index, pub_name)
+                self.labels[f'o{i+1}'],
+                pose_qos
             )
+            self.msgs[f'o{i+1}'] = self.make_msg(f'o{i+1}')
+            self.bufs[f'o{i+1}'] = memoryview(self.msgs[f'o{i+1}'].data)
+            if i < len(self.robots):
+                self.add_target(self.robots[i], self.state[i], f'o{i+1}')
         for i in range(0, 5):  
+            self.labels[f'e{i+1}'] = f'e{i+1}_data'
             self.publ[f'e{i+1}'] = self.create_publisher(
                 Float32MultiArray,
-                f'e{i+1}_data',
-                10
-            )
-            self.tim[f'e{i+1}'] = self.create_timer(
-                0.01,
-                lambda robot_index=i-1, pub_name=f'e{i+1}': self.publish_robot(robot_index, pub_name)
+                self.labels[f'e{i+1}'],
+                pose_qos
             )
-    def publish_robot(self, robot_index, publisher_name):
-        if robot_index < len(self.robots):
-            robot_pos = self.robots[robot_index].position.copy()
-            print(robot_pos)
-            robot_pos.append(0.0)
-            msg = Float32MultiArray()
-            msg.layout.dim.append(MultiArrayDimension())
-            msg.layout.dim[0].label = f"{publisher_name}_data"
-            msg.layout.dim[0].size = len(robot_pos)
-            msg.layout.dim[0].stride = len(robot_pos)
-            msg.layout.data_offset = 0
-            msg.data = robot_pos
-            self.publ[publisher_name].publish(msg)
-            self.get_logger().info(f'Published {publisher_name}')
-
-    def publish_opponent(self, opponent_index, publisher_name):
-        if opponent_index< len(self.opponents):
-            opponent_pos = self.opponents[opponent_index].position.copy()
-            opponent_pos.append(0.0)
-            msg = Float32MultiArray()
-            msg.layout.dim.append(MultiArrayDimension())
-            msg.layout.dim[0].label = f"{publisher_name}_data"
-            msg.layout.dim[0].size = len(opponent_pos)
-            msg.layout.dim[0].stride = len(opponent_pos)
-            msg.layout.data_offset = 0
-            msg.data = opponent_pos
-            self.publ[publisher_name].publish(msg)
-            self.get_logger().info(f'Published {publisher_name}')
+            self.msgs[f'e{i+1}'] = self.make_msg(f'e{i+1}')
+            self.bufs[f'e{i+1}'] = memoryview(self.msgs[f'e{i+1}'].data)
+            if i < len(self.opponents):
+                self.add_target(self.opponents[i], self.state[len(self.robots) + i], f'e{i+1}')
+        # A single 100 Hz timer publishes every topic, instead of one timer per publisher
+        self.tim['all'] = self.create_timer(0.01, self.publish_all)
+
+    def publish_all(self):
+        # Slice-assign each pre-built row view into its pre-allocated payload buffer:
+        # no list copies and no per-float boxing
+        # rclpy has no loaned-message publish API (borrow/publish_loaned_message exist only in
+        # rclcpp); where supported, targets publish pre-serialized CDR bytes instead, which skips
+        # the per-tick Python message conversion and CDR encoding. That path still allocates one
+        # small bytes object per publish, since rclpy only accepts immutable bytes
+        # Unchanged poses are skipped, except on a once-per-second heartbeat so late subscribers
+        # (and opponents, which never receive updates) still see every robot
+        self.ticks = (self.ticks + 1) % 100
+        heartbeat = self.ticks == 0
+        versions = self.published_versions
+        published = 0
+        for i, (robot, pose, buf, out, is_raw, publish) in enumerate(self.targets):
+            version = robot.pos_version
+            if version == versions[i] and not heartbeat:
+                continue
+            versions[i] = version
+            buf[:] = pose
+            publish(bytes(out) if is_raw else out)
+            published += 1
+        # Logging every publish at 100 Hz costs more than the publish itself
+        if published:
+            self.get_logger().debug('Published robot poses', throttle_duration_sec=1.0)
+
+    def make_msg(self, publisher_name):
+        # Layout never changes for a publisher, so build it once and only swap data later
+        msg = Float32MultiArray()
+        dim = MultiArrayDimension()
+        dim.label = self.labels[publisher_name]
+        dim.size = 3 # [x, y, 0.0]
+        dim.stride = 3
+        msg.layout.dim.append(dim)
+        msg.layout.data_offset = 0
+        # rclpy keeps an array('f') as-is instead of converting element by element,
+        # so the publish path can write into this buffer in place
+        msg.data = array.array('f', [0.0, 0.0, 0.0])
+        return msg
+
+    def add_target(self, robot, pose, publisher_name):
+        # Resolve the dict lookups and publish method once, not on every 100 Hz tick
+        msg = self.msgs[publisher_name]
+        publish = self.publ[publisher_name].publish
+        if RAW_PUBLISH_SUPPORTED:
+            # The layout never changes, so everything but the trailing float32 payload of the
+            # serialized message is constant. Keep that template and patch only the payload bytes
+            # (serialize_message uses native byte order, matching the float32 view below)
+            template = bytearray(serialize_message(msg))
+            payload = memoryview(template)[-4 * len(msg.data):].cast('f')
+            self.targets.append((robot, pose, payload, template, True, publish))
+        else:
+            self.targets.append((robot, pose, self.bufs[publisher_name], msg, False, publish))
+        self.published_versions.append(-1) # Always publish on the first tick
         
 
 
@@ -186,27 +309,59 @@ def main():
     logic = BaseStationLogic(app)
     app.logic = logic # Make logic accessible from UI (e.g., for button commands)
 
+    # Create the ROS node first: it rebinds every robot.position to a row of its shared state,
+    # which must happen before any WiFi receive thread can write a pose
+    rclpy.init(args=None)
+    ros_bs = ROSBaseStation(logic.robots, logic.opponents, logic.global_world.ball_position)
+
     # Initial connection attempts
     logic.connect_to_robots() 
     # logic.connect_to_refbox() # Optionally auto-connect to refbox on startup
 
-    # Start the periodic update loop
+    # Start the periodic update loop: aggregation on its worker, painting on the Tk thread
+    logic.start_world_updates()
     logic.update_world_state_and_ui()
-    rclpy.init(args=None)
-    ros_bs = ROSBaseStation(logic.robots, logic.opponents, logic.global_world.ball_position)
+    # "tk": pump rclpy from the Tk event loop, so ROS callbacks and the UI share one thread
+    #       and scheduler. Cheapest option; fine for timers up to ~200 Hz, but a slow repaint
+    #       delays the next publish.
+    # "thread": spin a MultiThreadedExecutor on a background thread. Publishing keeps its
+    #       cadence regardless of the UI, at the cost of cross-thread access to robot state.
+    ros_thread = None
+    if app.config['ros_spin'] == "thread":
+        executor = MultiThreadedExecutor(num_threads=4)
+        executor.add_node(ros_bs)
+        ros_thread = threading.Thread(target=executor.spin, daemon=True)
+        ros_thread.start()
+    else:
+        # One long-lived executor: rclpy.spin_once(node) would add and remove the node
+        # (and rebuild the wait set) on every pump
+        executor = SingleThreadedExecutor()
+        executor.add_node(ros_bs)
+        def pump_ros():
+            executor.spin_once(timeout_sec=0)
+            root.after(5, pump_ros)
+        pump_ros()
+
+    def close_app():
+        # Cleanup on exit, while the Tk root (and the log widget) still exists
+        print("Closing application. Disconnecting services...")
+        logic.stop_world_updates()
+        logic.disconnect_from_robots()
+        logic.stop_refbox()
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", close_app)
+
     try:
-        rclpy.spin(ros_bs)
+        root.mainloop()
     except KeyboardInterrupt:
-        pass
+        close_app()
     finally:
+        executor.shutdown()
+        if ros_thread:
+            ros_thread.join(timeout=1.0)
         ros_bs.destroy_node()
         rclpy.shutdown()
-    root.mainloop()
 
-    # Cleanup on exit
-    print("Closing application. Disconnecting services...")
-    logic.disconnect_from_robots()
-    logic.stop_refbox()
     print("Application closed.")
 
 
@@ -23,6 +23,7 @@ def load_config():
         config.setdefault('opponents', [])
         config.setdefault('field_dimensions', [12, 9])
         config.setdefault('local_map_view_range_m', 6) 
+        config.setdefault('ros_spin', "tk") # "tk" (pump from Tk mainloop) or "thread"
         return config
     except FileNotFoundError:
         messagebox.showerror("Error", f"Configuration file '{CONFIG_FILE}' not found.")
@@ -340,7 +341,8 @@ class BaseStationUI:
             view_tl_m_x, view_tl_m_y = field_w_m/2,field_h_m/2
 
         for robot_obj in robots_to_draw: 
-            if not hasattr(robot_obj, 'position') or not robot_obj.position or len(robot_obj.position) < 2:
+            # position may be a numpy row (ROSBaseStation.state), so no truthiness test on it
+            if getattr(robot_obj, 'position', None) is None or len(robot_obj.position) < 2:
                 # print(f"Skipping robot {robot_obj.robot_id if hasattr(robot_obj, 'robot_id') else 'Unknown'} due to missing/invalid position.")
                 continue
             rx_m, ry_m = robot_obj.position[0], robot_obj.position[1]
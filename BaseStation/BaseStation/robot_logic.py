@@ -9,6 +9,7 @@ class Robot:
         
         # Data from the robot's sensors/localization (global coordinates)
         self.position = list(initial_pos)  # [x, y]
+        self.pos_version = 0 # Bumped on every position update so publishers can skip unchanged poses
         self.orientation = initial_orient  # degrees
         self.local_ball_position = None  # [x, y] as seen by robot, in global frame
         self.local_obstacles = []        # List of [x, y] obstacles in global frame
@@ -37,7 +38,10 @@ class Robot:
             
             # Update robot's own pose (position and orientation)
             if 'position' in data_dict and len(data_dict['position']) == 3:
-                self.position = [data_dict['position'][0], data_dict['position'][1]]
+                # Write in place: position may be a row of ROSBaseStation's shared state array
+                self.position[0] = data_dict['position'][0]
+                self.position[1] = data_dict['position'][1]
+                self.pos_version += 1
                 self.orientation = data_dict['position'][2] # theta
             
             # Update ball position as seen by this robot (assumed global)
@@ -102,12 +106,18 @@ class GlobalWorldMap:
         # Aggregate ball position (e.g., average of robots that see it)
         # Aggregate obstacles (e.g., union of all seen obstacles)
         
-        # Ball position aggregation
+        # Single pass over connected robots for both ball sightings and obstacles
         visible_balls = []
+        all_obstacles = []
         for robot in robots:
-            if robot.connected and robot.local_ball_position: # Use local_ball_position
+            if not robot.connected:
+                continue
+            if robot.local_ball_position: # Use local_ball_position
                 visible_balls.append(robot.local_ball_position)
-        
+            if robot.local_obstacles:
+                all_obstacles.extend(robot.local_obstacles)
+
+        # Ball position aggregation
         if visible_balls:
             avg_ball_x = sum(pos[0] for pos in visible_balls) / len(visible_balls)
             avg_ball_y = sum(pos[1] for pos in visible_balls) / len(visible_balls)
@@ -115,11 +125,6 @@ class GlobalWorldMap:
         # else: keep last known or default if no robot sees the ball
 
         # Obstacle aggregation (simple union, could be improved with filtering/merging)
-        all_obstacles = []
-        for robot in robots:
-            if robot.connected and robot.local_obstacles:
-                all_obstacles.extend(robot.local_obstacles)
-        
         # To avoid duplicates if obstacles are represented precisely
         # This is a simple way; more robust methods might be needed for real-world noise
         unique_obstacles_tuples = {tuple(obs) for obs in all_obstacles}
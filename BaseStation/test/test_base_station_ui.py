@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'BaseStation'))
+
+from base_station_UI import BaseStationUI  # noqa: E402
+from robot_logic import Robot  # noqa: E402
+
+
+class RecordingCanvas:
+
+    def __init__(self):
+        self.ovals = []
+
+    def create_oval(self, *args, **kwargs):
+        self.ovals.append(args)
+
+    def create_line(self, *args, **kwargs):
+        pass
+
+    def create_text(self, *args, **kwargs):
+        pass
+
+
+class StubUI:
+    # draw_robots_on_field only reads self.robots (for the highlight check)
+
+    def __init__(self, robots):
+        self.robots = robots
+
+
+def make_state_robot():
+    # Same layout ROSBaseStation uses: position becomes a row of a shared float32 array
+    robot = Robot(1, initial_pos=(2, 4))
+    state = np.zeros((1, 3), dtype=np.float32)
+    state[0, :2] = robot.position[:2]
+    robot.position = state[0]
+    return robot
+
+
+def test_draw_robots_accepts_state_row_position():
+    robot = make_state_robot()
+    canvas = RecordingCanvas()
+    BaseStationUI.draw_robots_on_field(StubUI([robot]), canvas, [robot], 240, 160, (22, 14))
+    assert len(canvas.ovals) == 1
+
+
+def test_draw_robots_highlights_state_row_robot():
+    robot = make_state_robot()
+    canvas = RecordingCanvas()
+    BaseStationUI.draw_robots_on_field(StubUI([robot]), canvas, [robot], 240, 160, (22, 14),
+                                       highlight_robot_id=robot.robot_id)
+    assert len(canvas.ovals) == 2  # Robot body plus highlight ring
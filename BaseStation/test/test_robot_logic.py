@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'BaseStation'))
+
+from robot_logic import Robot  # noqa: E402
+
+
+def make_state_robot():
+    # Same layout ROSBaseStation uses: position becomes a row of a shared float32 array
+    robot = Robot(1, initial_pos=(2, 4))
+    state = np.zeros((1, 3), dtype=np.float32)
+    state[0, :2] = robot.position[:2]
+    robot.position = state[0]
+    return robot, state
+
+
+def test_received_position_is_written_into_shared_state():
+    robot, state = make_state_robot()
+    robot.handle_received_data(json.dumps({'position': [5.5, 1.5, 0.3]}))
+    assert robot.position is not None
+    assert state[0].tolist() == [5.5, 1.5, 0.0]
+    assert robot.orientation == 0.3
+    assert robot.pos_version == 1
+
+
+def test_received_position_updates_plain_list():
+    robot = Robot(1, initial_pos=(2, 4))
+    robot.handle_received_data(json.dumps({'position': [3, 7, 0]}))
+    assert robot.position == [3, 7]
+    assert robot.pos_version == 1